@@ -6,16 +6,30 @@ This file defines the /api/chat endpoint.
 When the frontend sends a message, this is where it arrives.
 """
 
-from fastapi import APIRouter, HTTPException, status
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from app.api.dependencies import get_gemini
 from app.models.schemas import ChatRequest, ChatResponse
-from app.services.gemini_service import gemini_service
+from app.services.gemini_service import GeminiRateLimitError, GeminiService
 
 # Create a router - this groups related endpoints together
 # APIRouter is like a mini-app that can be plugged into the main app
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+def _require_message(request: ChatRequest) -> None:
+    """Reject blank messages before we spend a Gemini call on them"""
+    if not request.message.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Message cannot be empty"
+        )
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, gemini: GeminiService = Depends(get_gemini)):
     """
     Chat with AI Assistant
 
@@ -43,14 +57,16 @@ async def chat(request: ChatRequest):
             "response": "The best time to visit Dubai is November to March..."
         }
     """
+    _require_message(request)
+
     try:
         # Extract the message and history from the request
         user_message = request.message
-        conversation_history = request.history
+        conversation_history = [m.model_dump() for m in request.history or []]
 
         # Send to Gemini AI service
         # The 'await' keyword means "wait for this to finish before continuing"
-        ai_response = await gemini_service.chat(
+        ai_response = await gemini.chat(
             message=user_message,
             history=conversation_history
         )
@@ -61,9 +77,16 @@ async def chat(request: ChatRequest):
             response=ai_response
         )
 
+    except GeminiRateLimitError as e:
+        # Gemini's quota is used up - tell the client to retry later
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
     except Exception as e:
         # If something goes wrong, return error response
-        print(f"Chat endpoint error: {str(e)}")
+        logger.exception("Chat endpoint error", extra={"user_id": request.user_id})
 
         # HTTPException is a special FastAPI error that gets
         # automatically converted to an HTTP error response
@@ -71,3 +94,72 @@ async def chat(request: ChatRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing chat request: {str(e)}"
         )
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, gemini: GeminiService = Depends(get_gemini)):
+    """
+    Chat with AI Assistant (streaming)
+
+    Same request as /api/chat, but the answer is sent back as
+    Server-Sent Events while Gemini is still writing it, so the
+    first words show up almost immediately.
+
+    Each event carries a piece of the answer:
+        data: {"delta": "The best time to visit Dubai "}
+
+        data: {"delta": "is November to March..."}
+
+        data: {"done": true}
+
+    If something goes wrong mid-answer, a final error event is sent:
+        data: {"error": "..."}
+
+    Errors before the first piece (e.g. rate limits) are normal
+    HTTP errors, just like /api/chat.
+    """
+    _require_message(request)
+
+    pieces = gemini.chat_stream(
+        message=request.message,
+        history=[m.model_dump() for m in request.history or []]
+    )
+
+    # Wait for the first piece before answering, so errors that happen
+    # up front still get a proper status code (429, 500)
+    try:
+        first_piece = await anext(pieces, None)
+
+    except GeminiRateLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
+    except Exception as e:
+        logger.exception("Chat stream error", extra={"user_id": request.user_id})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing chat request: {str(e)}"
+        )
+
+    async def event_stream():
+        try:
+            if first_piece is not None:
+                yield f"data: {json.dumps({'delta': first_piece})}\n\n"
+
+            async for piece in pieces:
+                yield f"data: {json.dumps({'delta': piece})}\n\n"
+
+            yield f"data: {json.dumps({'done': True})}\n\n"
+
+        except Exception as e:
+            # Headers are already sent, so report the error as an event
+            logger.exception("Chat stream error", extra={"user_id": request.user_id})
+            yield f"data: {json.dumps({'error': f'Error processing chat request: {str(e)}'})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Tell proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
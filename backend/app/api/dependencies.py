@@ -0,0 +1,22 @@
+"""
+API Dependencies
+Gives endpoints access to the shared services
+
+The services are created once when the app starts (see lifespan in main.py)
+and stored on app.state. Endpoints ask for them with Depends(...),
+so every request reuses the same clients and connection pools.
+"""
+
+from fastapi import Request
+from app.services.gemini_service import GeminiService
+from app.services.qdrant_service import QdrantService
+
+
+def get_gemini(request: Request) -> GeminiService:
+    """Shared Gemini AI service"""
+    return request.app.state.gemini
+
+
+def get_qdrant(request: Request) -> QdrantService:
+    """Shared Qdrant search service"""
+    return request.app.state.qdrant
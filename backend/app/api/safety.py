@@ -6,14 +6,18 @@ This file defines the /api/safety endpoint.
 It uses AI to analyze the safety of a location.
 """
 
-from fastapi import APIRouter, HTTPException, status
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.api.dependencies import get_gemini
 from app.models.schemas import SafetyCheckRequest, SafetyCheckResponse
-from app.services.gemini_service import gemini_service
+from app.services.gemini_service import GeminiRateLimitError, GeminiService
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 @router.post("/safety", response_model=SafetyCheckResponse)
-async def safety_check(request: SafetyCheckRequest):
+async def safety_check(request: SafetyCheckRequest, gemini: GeminiService = Depends(get_gemini)):
     """
     AI-Powered Safety Assessment
 
@@ -52,15 +56,22 @@ async def safety_check(request: SafetyCheckRequest):
             "time_of_day": "night"
         }
     """
+    # Reject blank location names before we spend a Gemini call on them
+    if not request.location_name.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Location name cannot be empty"
+        )
+
     try:
         # Extract request data
         location_name = request.location_name
-        coordinates = request.coordinates.dict()  # Convert to dictionary
+        coordinates = request.coordinates.model_dump()  # Convert to dictionary
         time_of_day = request.time_of_day
 
         # Perform AI safety analysis
         # This sends everything to Gemini AI which analyzes the safety
-        safety_result = await gemini_service.safety_check(
+        safety_result = await gemini.safety_check(
             location_name=location_name,
             coordinates=coordinates,
             time_of_day=time_of_day
@@ -77,8 +88,15 @@ async def safety_check(request: SafetyCheckRequest):
             time_of_day=safety_result.get('time_of_day')
         )
 
+    except GeminiRateLimitError as e:
+        # Gemini's quota is used up - tell the client to retry later
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
     except Exception as e:
-        print(f"Safety check endpoint error: {str(e)}")
+        logger.exception("Safety check endpoint error", extra={"user_id": request.user_id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error performing safety check: {str(e)}"
@@ -6,14 +6,18 @@ This file defines the /api/search endpoint.
 It performs "smart" searches that understand meaning, not just keywords.
 """
 
-from fastapi import APIRouter, HTTPException, status
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.api.dependencies import get_qdrant
 from app.models.schemas import SearchRequest, SearchResponse, SearchResult
-from app.services.qdrant_service import qdrant_service
+from app.services.qdrant_service import QdrantService
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 @router.post("/search", response_model=SearchResponse)
-async def search(request: SearchRequest):
+async def search(request: SearchRequest, qdrant: QdrantService = Depends(get_qdrant)):
     """
     Semantic Search for Locations
 
@@ -55,6 +59,13 @@ async def search(request: SearchRequest):
             "count": 5
         }
     """
+    # Reject blank queries before we spend an embedding call on them
+    if not request.query.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query cannot be empty"
+        )
+
     try:
         # Extract search parameters
         query = request.query
@@ -63,19 +74,21 @@ async def search(request: SearchRequest):
 
         # Perform semantic search using Qdrant service
         # This is where the "magic" happens - it finds similar meanings
-        search_results = await qdrant_service.search(
+        search_results = await qdrant.search(
             query=query,
             limit=limit,
-            filters=filters.dict() if filters else None
+            filters=filters.model_dump(exclude_none=True) if filters else None
         )
 
         # Convert raw results to SearchResult objects
+        # model_construct() skips validation - the response is validated
+        # against response_model when FastAPI sends it anyway
         formatted_results = []
         for result in search_results:
-            payload = result.get('payload', {})
+            payload = result.get('payload') or {}
             formatted_results.append(
-                SearchResult(
-                    id=result.get('id', ''),
+                SearchResult.model_construct(
+                    id=str(result.get('id', '')),
                     name=payload.get('name', 'Unknown'),
                     description=payload.get('description', ''),
                     category=payload.get('category', 'other'),
@@ -92,7 +105,7 @@ async def search(request: SearchRequest):
         )
 
     except Exception as e:
-        print(f"Search endpoint error: {str(e)}")
+        logger.exception("Search endpoint error", extra={"user_id": request.user_id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error performing search: {str(e)}"
@@ -23,6 +23,33 @@ class Settings(BaseSettings):
     # Qdrant Vector Database (optional)
     QDRANT_URL: Optional[str] = None
     QDRANT_API_KEY: Optional[str] = None
+    # gRPC is faster than REST; turn it off if the gRPC port isn't reachable
+    QDRANT_PREFER_GRPC: bool = True
+    QDRANT_GRPC_PORT: int = 6334
+    
+    # Gemini rate limits (requests / tokens per minute) for the whole app
+    # Requests wait in a queue instead of hitting Gemini's 429 errors
+    # Split evenly between worker processes (see WEB_CONCURRENCY)
+    MAX_RPM: int = 1000
+    MAX_TPM: int = 1_000_000
+    
+    # Semantic chat cache
+    # Questions whose embeddings are at least this similar (cosine) share an answer
+    CACHE_SIMILARITY_THRESHOLD: float = 0.92
+    # Compare only the first N embedding numbers (768 = the whole vector)
+    # Smaller sizes score differently, so they use their own threshold -
+    # calibrate it on real questions; unset = keep comparing whole vectors
+    CHAT_CACHE_VECTOR_SIZE: int = 768
+    CHAT_CACHE_REDUCED_SIMILARITY_THRESHOLD: Optional[float] = None
+    CHAT_CACHE_TTL_SECONDS: int = 86400
+    CHAT_CACHE_MAX_ENTRIES: int = 5000  # Only used by the in-memory fallback
+    
+    # Embedding cache (text -> vector), so repeated queries skip Gemini
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000  # Kept in memory
+    EMBEDDING_CACHE_PATH: Optional[str] = None  # SQLite file that survives restarts
+    
+    # Safety assessments are reused for the same place/time for this long
+    SAFETY_CACHE_TTL_SECONDS: int = 3600
     
     # Clerk Authentication
     CLERK_SECRET_KEY: str
@@ -31,10 +58,14 @@ class Settings(BaseSettings):
     APP_NAME: str = "Dubai Navigator AI"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
+    LOG_LEVEL: str = "INFO"
     
     # Server Settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    # Worker processes - uvicorn reads this environment variable too
+    # (unset: 1 with the uvicorn command, one per CPU core with `python -m app.main`)
+    WEB_CONCURRENCY: Optional[int] = None
     
     # CORS Origins (comma-separated list)
     CORS_ORIGINS: str = "http://localhost:3000,https://dubify-five.vercel.app"
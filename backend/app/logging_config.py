@@ -0,0 +1,115 @@
+"""
+Logging Setup
+Non-blocking logging with a request ID on every line
+
+Log calls only put the record on an in-memory queue; a background thread
+(QueueListener) does the slow part of writing to stderr. That keeps log
+output off the request's critical path.
+
+Every request gets an ID (taken from the X-Request-ID header, or generated),
+which is added to all log lines written while handling it and sent back in
+the X-Request-ID response header - so one request's logs are easy to find.
+"""
+
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# ID of the request currently being handled ("-" outside requests)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+logger = logging.getLogger(__name__)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Adds the current request ID to every log record
+
+    Also fills in user_id with "-" when the log call didn't pass one
+    (logger.exception(..., extra={"user_id": ...})), so the format string
+    can always include it.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if not hasattr(record, "user_id"):
+            record.user_id = "-"
+        return True
+
+
+def setup_logging(level: str = "INFO") -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Args:
+        level: Minimum level to log (e.g. "INFO", "DEBUG")
+
+    Returns:
+        The running QueueListener - call .stop() on shutdown to flush it
+    """
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s [%(request_id)s user=%(user_id)s] %(name)s: %(message)s"
+    ))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # The request ID must be read here, in the request's context,
+    # not later in the listener thread
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    # httpx logs every Gemini call at INFO - too noisy next to the request log
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class RequestIdMiddleware:
+    """
+    Gives each request an ID and logs how long it took
+
+    Written as plain ASGI middleware (not BaseHTTPMiddleware)
+    so streaming responses pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            logger.info(
+                "%s %s -> %d (%.1f ms)", scope["method"], scope["path"], status_code, latency_ms,
+                extra={"latency_ms": latency_ms, "status_code": status_code}
+            )
+            request_id_var.reset(token)
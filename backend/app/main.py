@@ -8,21 +8,84 @@ FastAPI is a modern Python web framework for building APIs.
 Think of this file as the "brain" that connects everything together.
 """
 
+import os
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 # Import our API routers
 from app.api import chat, search, safety
+from app.config import settings
+from app.logging_config import RequestIdMiddleware, setup_logging
+from app.services.gemini_service import GeminiService
+from app.services.qdrant_service import get_qdrant_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs once per worker: everything before `yield` on startup,
+    everything after it on shutdown
+
+    Services are created here (not at import time) and shared by all
+    requests through app.state - see app/api/dependencies.py.
+    """
+    # Log through a background thread so requests never wait on stderr
+    log_listener = setup_logging(settings.LOG_LEVEL)
+
+    # Make sure the locations collection and its payload indexes exist
+    app.state.qdrant = get_qdrant_service()
+    await app.state.qdrant.ensure_collection()
+
+    # Gemini client + background dispatcher for queued requests
+    app.state.gemini = await GeminiService.create()
+
+    # Build the OpenAPI schema now rather than on the first /docs visit
+    # (app.openapi() stores it in app.openapi_schema and reuses it after that)
+    app.openapi()
+
+    yield
+
+    # Stop background tasks and close pooled connections cleanly
+    await app.state.gemini.aclose()
+    await app.state.qdrant.aclose()
+    # The closed service must not be handed out again - the next startup
+    # (e.g. a second TestClient in the same process) builds a fresh one
+    get_qdrant_service.cache_clear()
+    log_listener.stop()
 
 app = FastAPI(
     title="Dubai Navigator AI API",
     description="AI-powered tourism companion backend with Gemini 2.5 Flash",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    # orjson serializes responses much faster than the standard json module
+    default_response_class=ORJSONResponse
 )
 
+class StreamFriendlyGZipMiddleware(GZipMiddleware):
+    """
+    GZip compression that leaves streaming endpoints alone
+
+    Gzip buffers small writes, which would hold back Server-Sent Events
+    until enough text piles up - exactly what streaming is meant to avoid.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Compress larger responses (search results are several KB of JSON)
+# Level 5 is a good balance between CPU time and size for on-the-fly JSON
+app.add_middleware(StreamFriendlyGZipMiddleware, minimum_size=512, compresslevel=5)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -34,6 +97,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tag every request with an ID (X-Request-ID) that shows up in all its log lines
+app.add_middleware(RequestIdMiddleware)
+
 # Include API routers
 # This connects our endpoints to the main app
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
@@ -62,9 +128,20 @@ async def health_check():
     }
 
 if __name__ == "__main__":
+    # Auto-reload in development; one worker per CPU core otherwise
+    # (uvicorn can't do both at once)
+    workers = 1 if settings.DEBUG else (settings.WEB_CONCURRENCY or os.cpu_count() or 1)
+    # Worker processes inherit this, so each one knows its share of the Gemini limits
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+        host=settings.HOST,
+        port=settings.PORT,
+        # uvloop (libuv event loop) and httptools (C HTTP parser) are much
+        # faster than the pure-Python defaults (uvloop doesn't support Windows)
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        reload=settings.DEBUG,
+        workers=None if settings.DEBUG else workers
     )
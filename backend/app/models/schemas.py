@@ -9,7 +9,7 @@ Example: If ChatRequest expects a 'message' field,
 Pydantic will reject requests that don't have it.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Optional
 
 # ============================================================================
@@ -47,15 +47,14 @@ class ChatRequest(BaseModel):
     history: Optional[List[ChatMessage]] = Field(default=None, description="Conversation history")
     user_id: str = Field(..., description="User ID from Clerk")
 
-    class Config:
-        # This shows an example in the API documentation
-        json_schema_extra = {
-            "example": {
-                "message": "What are the best restaurants in Dubai Marina?",
-                "history": [],
-                "user_id": "user_2abc123"
-            }
+    # This shows an example in the API documentation
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "message": "What are the best restaurants in Dubai Marina?",
+            "history": [],
+            "user_id": "user_2abc123"
         }
+    })
 
 class ChatResponse(BaseModel):
     """
@@ -103,18 +102,17 @@ class SearchRequest(BaseModel):
     filters: Optional[SearchFilters] = Field(None, description="Optional search filters")
     user_id: str = Field(..., description="User ID from Clerk")
 
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "query": "family-friendly activities near Burj Khalifa",
-                "limit": 10,
-                "filters": {
-                    "is_family_friendly": True,
-                    "max_price": 3
-                },
-                "user_id": "user_2abc123"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "query": "family-friendly activities near Burj Khalifa",
+            "limit": 10,
+            "filters": {
+                "is_family_friendly": True,
+                "max_price": 3
+            },
+            "user_id": "user_2abc123"
         }
+    })
 
 class SearchResult(BaseModel):
     """
@@ -164,15 +162,14 @@ class SafetyCheckRequest(BaseModel):
     time_of_day: str = Field(..., description="Time of day: morning/afternoon/evening/night")
     user_id: str = Field(..., description="User ID from Clerk")
 
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "location_name": "Jumeirah Beach",
-                "coordinates": {"lat": 25.2048, "lng": 55.2708},
-                "time_of_day": "night",
-                "user_id": "user_2abc123"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "location_name": "Jumeirah Beach",
+            "coordinates": {"lat": 25.2048, "lng": 55.2708},
+            "time_of_day": "night",
+            "user_id": "user_2abc123"
         }
+    })
 
 class SafetyCheckResponse(BaseModel):
     """
@@ -0,0 +1,360 @@
+"""
+Semantic Chat Cache
+Reuses Gemini answers for questions that mean the same thing
+
+Tourists ask the same questions again and again, just worded differently
+("best restaurants in Marina" vs "top restaurants Dubai Marina").
+Instead of waiting seconds for Gemini every time, we turn the question
+into a vector, look for a previously answered question with a very
+similar vector, and return that answer straight away.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client.models import (
+    Datatype,
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    Range,
+    VectorParams,
+)
+
+from app.config import settings
+from app.services.qdrant_service import EMBEDDING_SIZE, get_qdrant_service
+
+logger = logging.getLogger(__name__)
+
+# How often (at most) expired entries are deleted from the Qdrant collection
+CLEANUP_INTERVAL_SECONDS = 600
+
+# Compiled once - used to normalize every prompt before embedding
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalize a prompt so trivial differences don't cause cache misses
+
+    Lowercases, strips punctuation and collapses whitespace:
+    "  Best restaurants in Marina?! " -> "best restaurants in marina"
+    """
+    text = _PUNCTUATION_RE.sub(" ", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SemanticChatCache:
+    """
+    Semantic cache for chat responses
+
+    Stored in a Qdrant collection when Qdrant is configured,
+    otherwise kept in memory (for development/testing).
+
+    Every entry records two hashes:
+    - prompt_hash: hash of the normalized question (used as the point ID,
+      so the same question overwrites its old entry instead of piling up)
+    - context_hash: hash of everything else that shaped the answer
+      (model + system prompt). Entries are only reused when this matches,
+      so changing the system prompt never serves answers written for the old one.
+
+    Lookups happen in two steps:
+    1. Exact hit - the same normalized question was answered before. Found by
+       ID, then verified by comparing the stored prompt_hash, so an ID clash
+       can never return another question's answer. No embedding needed.
+    2. Semantic hit - a differently worded question with a similar enough
+       embedding (CACHE_SIMILARITY_THRESHOLD).
+    """
+
+    def __init__(self, context: str):
+        """
+        Args:
+            context: Text that (besides the question) determines the answer,
+                     e.g. model name + system prompt
+        """
+        # Questions can be compared on just the first CHAT_CACHE_VECTOR_SIZE
+        # embedding numbers - text-embedding-004's leading numbers work as a
+        # smaller embedding on their own (256 of 768: 3x less to store and compare).
+        # Cosine scores shift when vectors are shortened, so that needs its own
+        # threshold, calibrated on real questions; without one we compare full vectors
+        self.vector_size = min(settings.CHAT_CACHE_VECTOR_SIZE, EMBEDDING_SIZE)
+        self.similarity_threshold = settings.CACHE_SIMILARITY_THRESHOLD
+        if self.vector_size < EMBEDDING_SIZE:
+            if settings.CHAT_CACHE_REDUCED_SIMILARITY_THRESHOLD is None:
+                logger.warning(
+                    "CHAT_CACHE_VECTOR_SIZE=%d needs CHAT_CACHE_REDUCED_SIMILARITY_THRESHOLD, "
+                    "comparing full %d-number vectors instead", self.vector_size, EMBEDDING_SIZE
+                )
+                self.vector_size = EMBEDDING_SIZE
+            else:
+                self.similarity_threshold = settings.CHAT_CACHE_REDUCED_SIMILARITY_THRESHOLD
+
+        # Size in the name: a change of vector size starts a fresh collection
+        self.collection_name = f"chat_cache_{self.vector_size}"
+        self.context_hash = _sha256(context)
+        self.ttl_seconds = settings.CHAT_CACHE_TTL_SECONDS
+        self.max_entries = settings.CHAT_CACHE_MAX_ENTRIES
+
+        # In-memory fallback: row i of _vectors (normalized to length 1) belongs
+        # to _payloads[i], so one matrix multiply scores every cached question.
+        # Once full, new entries overwrite the oldest row (_next_row wraps around)
+        self._vectors = np.empty((0, self.vector_size), dtype=np.float32)
+        self._created_at = np.empty(0, dtype=np.float64)
+        self._payloads: List[Dict] = []
+        self._rows: Dict[str, int] = {}  # prompt_hash -> row
+        self._next_row = 0
+
+        # Qdrant collection setup runs once; the lock stops two first requests
+        # arriving together from both trying to create it
+        self._collection_ready = False
+        self._collection_lock = asyncio.Lock()
+
+        # Expired entries are deleted in the background every so often
+        self._last_cleanup = 0.0
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    async def lookup(self, message: str) -> Tuple[Optional[str], Optional[Sequence[float]]]:
+        """
+        Look for a cached answer to a similar question
+
+        Args:
+            message: The user's question
+
+        Returns:
+            (cached response or None, question embedding or None)
+            The embedding is returned so store() doesn't need to compute it again.
+        """
+        qdrant_service = get_qdrant_service()
+        normalized = normalize_prompt(message)
+        min_created_at = time.time() - self.ttl_seconds
+        try:
+            # Step 1: exactly this question (after normalizing)?
+            exact_response = await self._exact_lookup(_sha256(normalized), min_created_at)
+            if exact_response is not None:
+                return exact_response, None
+
+            # Step 2: a question that means the same thing?
+            vector = (await qdrant_service.create_embedding(normalized))[:self.vector_size]
+
+            # A zero vector means embedding failed - nothing useful to compare
+            if not any(vector):
+                return None, None
+
+            if qdrant_service.use_qdrant:
+                response = await qdrant_service.client.query_points(
+                    collection_name=self.collection_name,
+                    query=list(vector),  # query_points only accepts lists
+                    query_filter=Filter(must=[
+                        FieldCondition(key="context_hash", match=MatchValue(value=self.context_hash)),
+                        FieldCondition(key="created_at", range=Range(gte=min_created_at)),
+                    ]),
+                    limit=1,
+                    score_threshold=self.similarity_threshold
+                )
+                if response.points:
+                    return response.points[0].payload.get("response"), vector
+                return None, vector
+
+            return self._in_memory_lookup(vector, min_created_at), vector
+
+        except Exception:
+            logger.exception("Chat cache lookup error")
+            return None, None
+
+    async def store(self, message: str, vector: Optional[Sequence[float]], response: str) -> None:
+        """
+        Save an answer so similar questions can reuse it
+
+        Args:
+            message: The user's question
+            vector: Embedding returned by lookup() (skipped if None)
+            response: Gemini's answer
+        """
+        if not vector:
+            return
+
+        normalized = normalize_prompt(message)
+        prompt_hash = _sha256(normalized)
+        payload = {
+            "prompt_text": normalized,
+            "prompt_hash": prompt_hash,
+            "context_hash": self.context_hash,
+            "response": response,
+            "created_at": time.time()
+        }
+
+        qdrant_service = get_qdrant_service()
+        try:
+            if qdrant_service.use_qdrant:
+                await self._ensure_collection()
+                await qdrant_service.client.upsert(
+                    collection_name=self.collection_name,
+                    points=[PointStruct(
+                        id=self._point_id(prompt_hash),
+                        vector=vector,
+                        payload=payload
+                    )]
+                )
+                self._schedule_cleanup()
+                return
+
+            self._in_memory_store(vector, payload)
+
+        except Exception:
+            logger.exception("Chat cache store error")
+
+    def _point_id(self, prompt_hash: str) -> str:
+        """Same question + same context -> same point ID"""
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{self.context_hash}:{prompt_hash}"))
+
+    async def _exact_lookup(self, prompt_hash: str, min_created_at: float) -> Optional[str]:
+        """Return the cached answer to exactly this question, or None"""
+        qdrant_service = get_qdrant_service()
+        if qdrant_service.use_qdrant:
+            await self._ensure_collection()
+            points = await qdrant_service.client.retrieve(
+                collection_name=self.collection_name,
+                ids=[self._point_id(prompt_hash)],
+                with_payload=True,
+                with_vectors=False
+            )
+            payload = points[0].payload if points else None
+        else:
+            row = self._rows.get(prompt_hash)
+            payload = self._payloads[row] if row is not None else None
+
+        # Verify it really is this question, for this context, and still fresh
+        if (
+            payload
+            and payload.get("prompt_hash") == prompt_hash
+            and payload.get("context_hash") == self.context_hash
+            and payload.get("created_at", 0) >= min_created_at
+        ):
+            return payload.get("response")
+        return None
+
+    async def _ensure_collection(self) -> None:
+        """Create the cache collection and its payload indexes the first time they're needed"""
+        if self._collection_ready:
+            return
+
+        async with self._collection_lock:
+            if self._collection_ready:
+                return
+
+            client = get_qdrant_service().client
+            if not await client.collection_exists(self.collection_name):
+                try:
+                    await client.create_collection(
+                        collection_name=self.collection_name,
+                        # FLOAT16 halves the storage again; cosine scores barely change
+                        vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE, datatype=Datatype.FLOAT16)
+                    )
+                except Exception:
+                    # Another worker process may have created it first
+                    if not await client.collection_exists(self.collection_name):
+                        raise
+
+            # Every lookup filters on these two fields, and cleanup on created_at
+            await client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="context_hash",
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+            await client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="created_at",
+                field_schema=PayloadSchemaType.FLOAT
+            )
+            self._collection_ready = True
+
+    def _schedule_cleanup(self) -> None:
+        """Start deleting expired entries in the background, at most every CLEANUP_INTERVAL_SECONDS"""
+        now = time.time()
+        if now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        if self._cleanup_task is not None and not self._cleanup_task.done():
+            return
+
+        self._last_cleanup = now
+        self._cleanup_task = asyncio.create_task(self._delete_expired())
+
+    async def _delete_expired(self) -> None:
+        """
+        Delete entries older than the TTL from the Qdrant collection
+
+        Lookups already ignore them, but without this the collection
+        would keep one point per question ever asked.
+        """
+        try:
+            await get_qdrant_service().client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(filter=Filter(must=[
+                    FieldCondition(key="created_at", range=Range(lt=time.time() - self.ttl_seconds))
+                ])),
+                wait=False
+            )
+        except Exception:
+            logger.exception("Chat cache cleanup error")
+
+    def _in_memory_lookup(self, vector: Sequence[float], min_created_at: float) -> Optional[str]:
+        """Find the most similar cached question (cosine similarity)"""
+        count = len(self._payloads)
+        if count == 0:
+            return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+
+        # Cosine similarity with every cached question at once; expired ones can't win
+        scores = self._vectors[:count] @ (query / norm)
+        scores[self._created_at[:count] < min_created_at] = -np.inf
+
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return self._payloads[best]["response"]
+        return None
+
+    def _in_memory_store(self, vector: Sequence[float], payload: Dict) -> None:
+        """Add an entry, replacing the same question and overwriting the oldest when full"""
+        row = self._rows.get(payload["prompt_hash"])
+
+        if row is None:
+            if len(self._payloads) < self.max_entries:
+                # Still room: use the next free row, growing the arrays by doubling
+                row = len(self._payloads)
+                self._payloads.append(payload)
+                if row == len(self._vectors):
+                    capacity = min(max(2 * row, 64), self.max_entries)
+                    self._vectors = np.resize(self._vectors, (capacity, self.vector_size))
+                    self._created_at = np.resize(self._created_at, capacity)
+            else:
+                # Full: overwrite the oldest entry
+                row = self._next_row
+                self._next_row = (row + 1) % self.max_entries
+                del self._rows[self._payloads[row]["prompt_hash"]]
+
+            self._rows[payload["prompt_hash"]] = row
+
+        normalized = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(normalized)
+        self._vectors[row] = normalized / norm if norm else normalized
+        self._created_at[row] = payload["created_at"]
+        self._payloads[row] = payload
@@ -0,0 +1,197 @@
+"""
+Embedding Cache
+Remembers text -> vector results so Gemini is only asked once per text
+
+Every search starts by turning the query into a vector, which is a network
+round trip to Gemini. Popular queries repeat constantly, so we keep recent
+vectors in memory (and optionally in a small SQLite file, so a restarted
+server doesn't start cold).
+
+Lookups happen inside the worker thread that calls Gemini, so the SQLite
+reads never block the event loop. Writes go to a background thread, so a
+slow disk never holds up a request.
+
+The SQLite file is only a bonus: if it's locked (e.g. by another uvicorn
+worker) or broken, the error is logged and the cache carries on from memory.
+"""
+
+import hashlib
+import logging
+import queue
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Give up on a locked SQLite read quickly - asking Gemini again is cheaper
+# than waiting. The writer is off the request path, so it can wait longer
+SQLITE_READ_TIMEOUT_SECONDS = 0.1
+SQLITE_WRITE_TIMEOUT_SECONDS = 5.0
+
+# Most vectors the writer thread saves in one transaction
+SQLITE_WRITE_BATCH_SIZE = 100
+
+# Put on the write queue to stop the writer thread
+_STOP = object()
+
+
+class EmbeddingCache:
+    """
+    Least-recently-used cache of embeddings, keyed by SHA-256 of the text
+
+    Two tiers:
+    1. In memory (OrderedDict) - the most recent `max_entries` vectors
+    2. On disk (SQLite, optional) - every vector ever stored, keyed by
+       (model, hash) so switching embedding models never returns old vectors
+    """
+
+    def __init__(self, model: str, max_entries: int = 10_000, path: Optional[str] = None):
+        """
+        Args:
+            model: Embedding model name (part of the on-disk key)
+            max_entries: How many vectors to keep in memory
+            path: SQLite file for the on-disk tier (None = memory only)
+        """
+        self.model = model
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        # Gemini calls run in several threads at once. This lock only ever
+        # guards the in-memory dict, never disk I/O, so memory hits stay fast
+        self._lock = threading.Lock()
+
+        # Disk tier: one connection for reads (shared by the Gemini threads),
+        # one owned by the writer thread
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._write_queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+        if path:
+            try:
+                self._open(path)
+            except sqlite3.Error:
+                logger.exception("Embedding cache: can't open %s, using memory only", path)
+                self._db = None
+
+    def _open(self, path: str) -> None:
+        """Create the table and start the background writer"""
+        writer_db = sqlite3.connect(path, timeout=SQLITE_WRITE_TIMEOUT_SECONDS, check_same_thread=False)
+        # WAL lets reads carry on while another connection (or worker) writes
+        writer_db.execute("PRAGMA journal_mode=WAL")
+        writer_db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        writer_db.commit()
+
+        self._db = sqlite3.connect(path, timeout=SQLITE_READ_TIMEOUT_SECONDS, check_same_thread=False)
+        self._writer = threading.Thread(
+            target=self._write_loop, args=(writer_db,), name="embedding-cache-writer", daemon=True
+        )
+        self._writer.start()
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Fixed-size cache key, however long the text is"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[float, ...]]:
+        """Return the cached vector for a key, or None"""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)  # Mark as recently used
+                return vector
+
+        vector = self._read_from_disk(key)
+        if vector is not None:
+            with self._lock:
+                self._remember(key, vector)
+        return vector
+
+    def put(self, key: str, vector: Tuple[float, ...]) -> None:
+        """Store a vector in memory (and queue it for disk, if enabled)"""
+        with self._lock:
+            self._remember(key, vector)
+        if self._writer is not None:
+            self._write_queue.put((key, vector))
+
+    def close(self) -> None:
+        """Save queued vectors and close the SQLite file (called on app shutdown)"""
+        if self._writer is not None:
+            self._write_queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, vector: Tuple[float, ...]) -> None:
+        """Add to the in-memory tier, evicting the least recently used entry when full"""
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_from_disk(self, key: str) -> Optional[Tuple[float, ...]]:
+        """Look a key up in SQLite; any error counts as a miss"""
+        with self._db_lock:
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?",
+                    (self.model, key)
+                ).fetchone()
+            except sqlite3.Error:
+                logger.warning("Embedding cache: SQLite read failed, treating as a miss", exc_info=True)
+                return None
+
+        if row is None:
+            return None
+        return tuple(array("f", row[0]))
+
+    def _write_loop(self, db: sqlite3.Connection) -> None:
+        """
+        Background thread: save queued vectors in batches
+
+        A failed batch is logged and dropped - the vectors are still in memory,
+        and the worst case is embedding that text again after a restart.
+        """
+        try:
+            while True:
+                batch: List[Tuple[str, Tuple[float, ...]]] = []
+                item = self._write_queue.get()
+                # Grab whatever else is already waiting (one commit for all of it)
+                while item is not _STOP:
+                    batch.append(item)
+                    if len(batch) >= SQLITE_WRITE_BATCH_SIZE:
+                        break
+                    try:
+                        item = self._write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    try:
+                        db.executemany(
+                            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                            [(self.model, key, array("f", vector).tobytes()) for key, vector in batch]
+                        )
+                        db.commit()
+                    except sqlite3.Error:
+                        logger.warning(
+                            "Embedding cache: SQLite write of %d vectors failed", len(batch), exc_info=True
+                        )
+                        db.rollback()
+
+                if item is _STOP:
+                    return
+        finally:
+            db.close()
@@ -6,9 +6,134 @@ This service is like a "translator" between our app and Google's AI.
 It sends requests to Gemini and processes the responses.
 """
 
-import google.generativeai as genai
+import asyncio
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+import httpx
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from app.config import settings
-from typing import List, Dict, Optional
+from app.services.chat_cache import SemanticChatCache
+from typing import AsyncIterator, List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Gemini REST API
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+
+# How many queued requests the dispatcher picks up per round
+MAX_DISPATCH_BATCH = 32
+
+# Our chat roles -> Gemini conversation roles
+GEMINI_ROLES = {"user": "user", "assistant": "model"}
+
+# Keywords used to estimate risk from the AI's analysis
+SAFE_KEYWORDS = frozenset(['safe', 'low risk', 'secure', 'protected', 'tourist-friendly'])
+DANGER_KEYWORDS = frozenset(['danger', 'high risk', 'avoid', 'caution', 'unsafe', 'critical'])
+
+# One compiled pattern finds all risk keywords in a single pass over the text
+# The lookahead lets matches overlap, so "unsafe" counts as both "unsafe" and "safe"
+# (same as checking each keyword with `in`)
+_RISK_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(SAFE_KEYWORDS | DANGER_KEYWORDS)) + "))",
+    re.IGNORECASE
+)
+
+# Lines containing these words are treated as recommendations
+# (substring match, so "recommended" and "avoiding" count too)
+_RECOMMENDATION_RE = re.compile(r"should|recommend|consider|avoid|ensure", re.IGNORECASE)
+
+# Rough token estimate: ~4 characters per token, plus room for the answer
+CHARS_PER_TOKEN = 4
+EXPECTED_RESPONSE_TOKENS = 512
+
+
+class GeminiRateLimitError(Exception):
+    """Gemini is still rejecting requests with 429 (quota exhausted) after retrying"""
+
+
+def _check_status(response: httpx.Response) -> None:
+    """Raise for error responses, with rate limiting as its own exception type"""
+    if response.status_code == 429:
+        raise GeminiRateLimitError("Gemini rate limit exceeded, please try again shortly")
+    response.raise_for_status()
+
+
+def _estimate_tokens(body: Dict) -> int:
+    """Rough token cost of a request (prompt characters / 4 + expected answer)"""
+    contents = body.get("contents", [])
+    if "systemInstruction" in body:
+        contents = [*contents, body["systemInstruction"]]
+
+    prompt_chars = sum(
+        len(part.get("text", ""))
+        for content in contents
+        for part in content.get("parts", [])
+    )
+    return prompt_chars // CHARS_PER_TOKEN + EXPECTED_RESPONSE_TOKENS
+
+
+def _candidate_text(data: Dict) -> str:
+    """Extract the generated text from a Gemini generateContent response"""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        raise ValueError("Gemini returned no candidates")
+
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+class _RateLimiter:
+    """
+    Keeps us under Gemini's requests-per-minute and tokens-per-minute limits
+
+    Capacity refills continuously over time (the same approach as the
+    OpenAI cookbook's api_request_parallel_processor). Each request waits
+    until there is room for one more request and its estimated tokens,
+    instead of firing and getting a 429 back.
+    """
+
+    def __init__(self, max_rpm: int, max_tpm: int):
+        self.max_rpm = max_rpm
+        self.max_tpm = max_tpm
+        self.available_requests = float(max_rpm)
+        self.available_tokens = float(max_tpm)
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request using `tokens` tokens fits within the limits"""
+        tokens = min(tokens, self.max_tpm)
+
+        async with self._lock:
+            while True:
+                # Refill capacity for the time that passed since the last call
+                now = time.monotonic()
+                elapsed = now - self.last_update
+                self.last_update = now
+                self.available_requests = min(
+                    self.max_rpm, self.available_requests + self.max_rpm * elapsed / 60
+                )
+                self.available_tokens = min(
+                    self.max_tpm, self.available_tokens + self.max_tpm * elapsed / 60
+                )
+
+                if self.available_requests >= 1 and self.available_tokens >= tokens:
+                    self.available_requests -= 1
+                    self.available_tokens -= tokens
+                    return
+
+                # Sleep just long enough for the missing capacity to refill
+                wait_seconds = max(
+                    (1 - self.available_requests) * 60 / self.max_rpm,
+                    (tokens - self.available_tokens) * 60 / self.max_tpm
+                )
+                await asyncio.sleep(max(wait_seconds, 0.001))
+
 
 class GeminiService:
     """
@@ -25,12 +150,22 @@ class GeminiService:
 
         This sets up the connection to Gemini AI using our API key.
         """
-        # Configure the Gemini API with our key from environment variables
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-
-        # Create a model instance - this is what we'll use to generate responses
+        # REST endpoint for the model we use
         # gemini-2.0-flash-exp is the latest, fastest Gemini model
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.generate_url = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:generateContent"
+        # Same request, but Gemini sends the answer back piece by piece (Server-Sent Events)
+        self.stream_url = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:streamGenerateContent?alt=sse"
+        self.headers = {"x-goog-api-key": settings.GEMINI_API_KEY}
+
+        # One shared async HTTP client for every Gemini call
+        # - Keeps connections alive, so we don't pay TCP + TLS setup per request
+        # - HTTP/2 lets many requests share a single connection
+        # - Async, so waiting on Gemini never blocks the event loop
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
 
         # System prompt for Dubai tourism chatbot
         # This "teaches" the AI how to behave
@@ -46,6 +181,217 @@ Guidelines:
 
 Focus on: attractions, restaurants, culture, safety, transportation, best times to visit."""
 
+        # Sent as Gemini's system instruction instead of being pasted in front
+        # of every message - built once here and reused for every chat request
+        self.system_instruction = {"parts": [{"text": self.tourism_system_prompt}]}
+
+        # Semantic cache for chat answers
+        # Similar questions ("best restaurants in Marina" / "top restaurants Dubai Marina")
+        # reuse a previous answer instead of waiting on Gemini again
+        self.chat_cache = SemanticChatCache(
+            context=f"{GEMINI_MODEL}\n{self.tourism_system_prompt}"
+        )
+
+        # Safety assessments barely change within an hour, and tourists keep
+        # checking the same places (Burj Khalifa in the evening, Marina at night)
+        # Key: (location name, lat, lng rounded to ~100m, time of day)
+        self.safety_cache = TTLCache(maxsize=10_000, ttl=settings.SAFETY_CACHE_TTL_SECONDS)
+
+        # Assessments currently being generated, by cache key
+        # Identical requests arriving at the same time share one Gemini call
+        self._safety_in_flight: Dict[tuple, asyncio.Task] = {}
+
+        # All Gemini requests go through one queue, so the rate limits below
+        # apply across chat, safety and any other endpoint
+        # Each item is (request body, future that receives the generated text)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._dispatch_tasks: set = set()  # Keeps running dispatches referenced
+        # Every worker process has its own limiter, so each gets an equal
+        # share of the app-wide limits (otherwise N workers = N x the quota)
+        workers = settings.WEB_CONCURRENCY or 1
+        max_rpm = max(1, settings.MAX_RPM // workers)
+        max_tpm = max(1, settings.MAX_TPM // workers)
+        self._rate_limiter = _RateLimiter(max_rpm, max_tpm)
+        # Requests allowed in flight at once (roughly our per-second budget)
+        self._concurrency = asyncio.Semaphore(max(1, max_rpm // 60))
+
+    @classmethod
+    async def create(cls) -> "GeminiService":
+        """
+        Create a ready-to-use service (called once per worker on app startup)
+
+        Must run inside the event loop, since it starts the background dispatcher.
+        """
+        service = cls()
+        service.start()
+        return service
+
+    async def aclose(self) -> None:
+        """Stop the dispatcher and close pooled connections (called on app shutdown)"""
+        await self.stop()
+        await self.http_client.aclose()
+
+    def start(self) -> None:
+        """Start the background dispatcher"""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_queue())
+
+    async def stop(self) -> None:
+        """Stop the background dispatcher"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    async def _dispatch_queue(self) -> None:
+        """
+        Background loop: hand queued requests to Gemini within the rate limits
+
+        Waits for a request, then picks up everything else already queued
+        (up to MAX_DISPATCH_BATCH) and sends them concurrently.
+        """
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < MAX_DISPATCH_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            for body, future in batch:
+                task = asyncio.create_task(self._dispatch(body, future))
+                self._dispatch_tasks.add(task)
+                task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch(self, body: Dict, future: asyncio.Future) -> None:
+        """Send one queued request once the rate limiter allows it"""
+        try:
+            text = await self._send(body)
+
+            if not future.done():
+                future.set_result(text)
+
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    async def _generate(self, body: Dict) -> str:
+        """
+        Queue a request for Gemini and wait for the generated text
+
+        Args:
+            body: generateContent request body
+
+        Returns:
+            Generated text
+        """
+        # Also works outside the app (scripts), where startup never ran
+        self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((body, future))
+        return await future
+
+    def _chat_body(self, message: str, history: Optional[List[Dict[str, str]]] = None) -> Dict:
+        """
+        Build the generateContent request body for a chat message
+
+        Previous messages are sent as separate conversation turns
+        (Gemini calls the assistant "model"), so the AI sees the whole
+        conversation, not just the latest message.
+        """
+        contents = []
+        for turn in [*(history or []), {"role": "user", "content": message}]:
+            if turn.get("role") not in GEMINI_ROLES or not turn.get("content"):
+                continue
+
+            role = GEMINI_ROLES[turn["role"]]
+            part = {"text": turn["content"]}
+
+            # Merge consecutive messages from the same side into one turn
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"].append(part)
+            else:
+                contents.append({"role": role, "parts": [part]})
+
+        return {
+            "systemInstruction": self.system_instruction,
+            "contents": contents
+        }
+
+    # On 429, back off (randomized exponential, up to 20s) and try again,
+    # up to 4 attempts in total, instead of failing the request right away
+    @retry(
+        wait=wait_random_exponential(multiplier=1, max=20),
+        stop=stop_after_attempt(4),
+        retry=retry_if_exception_type(GeminiRateLimitError),
+        reraise=True
+    )
+    async def _send(self, body: Dict) -> str:
+        """
+        One rate-limited attempt at a request: wait for the limits, then post
+
+        The retry wraps this whole method, so every attempt (retries too)
+        is counted against the RPM/TPM budget, and the concurrency slot is
+        given back while backing off instead of being held during the wait.
+        """
+        await self._rate_limiter.acquire(_estimate_tokens(body))
+
+        async with self._concurrency:
+            return await self._post(body)
+
+    async def _post(self, body: Dict) -> str:
+        """
+        Send a request body to Gemini's REST API and return the generated text
+
+        Args:
+            body: generateContent request body
+
+        Returns:
+            Generated text
+
+        Raises:
+            GeminiRateLimitError: If Gemini answers 429
+            httpx.HTTPStatusError: If Gemini returns another error status
+            ValueError: If Gemini returned no text (e.g. blocked by safety filters)
+        """
+        response = await self.http_client.post(
+            self.generate_url,
+            headers=self.headers,
+            json=body
+        )
+        _check_status(response)
+        return _candidate_text(response.json())
+
+    async def _stream(self, body: Dict) -> AsyncIterator[str]:
+        """
+        Send a request body to Gemini's streaming endpoint
+
+        Yields:
+            Pieces of generated text as soon as Gemini produces them
+        """
+        # Streams skip the queue (they can't be handed back through a future),
+        # but still respect the same rate limits
+        await self._rate_limiter.acquire(_estimate_tokens(body))
+
+        async with self._concurrency:
+            async with self.http_client.stream(
+                "POST",
+                self.stream_url,
+                headers=self.headers,
+                json=body
+            ) as response:
+                _check_status(response)
+
+                # Each event looks like: data: {"candidates": [...]}
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    text = _candidate_text(json.loads(line[len("data:"):]))
+                    if text:
+                        yield text
+
     async def chat(self, message: str, history: Optional[List[Dict[str, str]]] = None) -> str:
         """
         Send a chat message to Gemini and get a response
@@ -57,28 +403,71 @@ Focus on: attractions, restaurants, culture, safety, transportation, best times
         Returns:
             AI's response as a string
 
+        Raises:
+            GeminiRateLimitError: If Gemini's quota is exhausted
+
         How it works:
-        1. Takes user's message
-        2. Adds system prompt to guide AI behavior
-        3. Sends to Gemini AI
-        4. Returns AI's response
+        1. Checks the semantic cache for a similar, already answered question
+        2. Sends it to Gemini AI, with the system prompt as system instruction
+        3. Caches and returns AI's response
         """
-        try:
-            # Add the system prompt and current message
-            full_prompt = f"{self.tourism_system_prompt}\n\nUser: {message}"
+        # Only standalone questions are cached - with history,
+        # the same question can need a different answer
+        use_cache = not history
+        question_vector = None
 
-            # Send to Gemini and get response
-            # generate_content() is the main method that talks to the AI
-            response = self.model.generate_content(full_prompt)
+        if use_cache:
+            cached_response, question_vector = await self.chat_cache.lookup(message)
+            if cached_response is not None:
+                return cached_response
 
-            # Extract and return the text response
-            return response.text
+        # Send to Gemini (with the system prompt and conversation so far)
+        # and get the text response
+        # Errors are raised so the endpoint can answer with the right status code
+        ai_response = await self._generate(self._chat_body(message, history))
 
-        except Exception as e:
-            # If something goes wrong, return an error message
-            # In production, you'd log this error
-            print(f"Gemini chat error: {str(e)}")
-            return f"I apologize, but I encountered an error: {str(e)}"
+        # Cache it and return it
+        if use_cache:
+            await self.chat_cache.store(message, question_vector, ai_response)
+
+        return ai_response
+
+    async def chat_stream(
+        self,
+        message: str,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Like chat(), but yields the answer piece by piece as Gemini writes it
+
+        The user sees the first words after a few hundred milliseconds
+        instead of waiting for the whole answer.
+
+        Args:
+            message: The user's question/message
+            history: Previous conversation history (optional)
+
+        Yields:
+            Pieces of the AI's response
+        """
+        use_cache = not history
+        question_vector = None
+
+        if use_cache:
+            cached_response, question_vector = await self.chat_cache.lookup(message)
+            if cached_response is not None:
+                # Already have the whole answer - send it in one piece
+                yield cached_response
+                return
+
+        # Collect the pieces so the complete answer can be cached afterwards
+        pieces = []
+        async for piece in self._stream(self._chat_body(message, history)):
+            pieces.append(piece)
+            yield piece
+
+        if use_cache:
+            await self.chat_cache.store(message, question_vector, "".join(pieces))
 
     async def safety_check(
         self,
@@ -98,14 +487,67 @@ Focus on: attractions, restaurants, culture, safety, transportation, best times
             Dictionary with risk score, level, and recommendations
 
         How it works:
-        1. Creates a detailed prompt asking AI to analyze safety
-        2. Sends to Gemini AI
+        1. Returns a recent assessment of the same place and time if we have one
+        2. Otherwise asks Gemini (sharing the call with identical concurrent requests)
         3. Parses AI's response
-        4. Returns structured data
+        4. Caches and returns structured data
         """
+        cache_key = (
+            location_name.lower(),
+            round(coordinates.get('lat', 0.0), 3),
+            round(coordinates.get('lng', 0.0), 3),
+            time_of_day
+        )
+
         try:
-            # Create a detailed prompt for safety analysis
-            safety_prompt = f"""Analyze the safety of this Dubai location:
+            cached = self.safety_cache.get(cache_key)
+            if cached is None:
+                # Single-flight: only the first request starts a Gemini call,
+                # others arriving meanwhile wait for the same result
+                task = self._safety_in_flight.get(cache_key)
+                if task is None:
+                    task = asyncio.create_task(
+                        self._assess_safety(cache_key, location_name, coordinates, time_of_day)
+                    )
+                    self._safety_in_flight[cache_key] = task
+                    task.add_done_callback(lambda _: self._safety_in_flight.pop(cache_key, None))
+
+                # shield() so one client disconnecting doesn't cancel the call for everyone
+                cached = await asyncio.shield(task)
+
+            # Report the location exactly as this caller spelled it
+            return {**cached, "location": location_name}
+
+        except GeminiRateLimitError:
+            # Not a problem with this location - let the endpoint report it (429)
+            raise
+
+        except Exception as e:
+            logger.exception("Gemini safety check error")
+            # Return a safe default response if there's an error
+            return {
+                "risk_score": 50,
+                "risk_level": "medium",
+                "analysis": f"Error performing safety analysis: {str(e)}",
+                "recommendations": ["Unable to assess safety at this time"],
+                "location": location_name,
+                "time_of_day": time_of_day
+            }
+
+    async def _assess_safety(
+        self,
+        cache_key: tuple,
+        location_name: str,
+        coordinates: Dict[str, float],
+        time_of_day: str
+    ) -> Dict:
+        """
+        Ask Gemini for a safety assessment and cache the result
+
+        Errors are raised (and not cached) so the next request tries again.
+        """
+        # Create a detailed prompt for safety analysis
+        safety_prompt = f"""Analyze the safety of this Dubai location:
 
 Location: {location_name}
 Coordinates: {coordinates.get('lat')}, {coordinates.get('lng')}
@@ -124,35 +566,27 @@ Consider factors like:
 - Cultural considerations
 - Emergency services availability"""
 
-            # Get AI analysis
-            response = self.model.generate_content(safety_prompt)
-            analysis = response.text
+        # Get AI analysis
+        analysis = await self._generate(
+            {"contents": [{"role": "user", "parts": [{"text": safety_prompt}]}]}
+        )
 
-            # Parse the AI response and create structured data
-            # These helper methods extract information from the text
-            risk_score = self._estimate_risk_score(analysis)
-            risk_level = self._get_risk_level(risk_score)
+        # Parse the AI response and create structured data
+        # These helper methods extract information from the text
+        risk_score = self._estimate_risk_score(analysis)
+        risk_level = self._get_risk_level(risk_score)
 
-            return {
-                "risk_score": risk_score,
-                "risk_level": risk_level,
-                "analysis": analysis,
-                "recommendations": self._extract_recommendations(analysis),
-                "location": location_name,
-                "time_of_day": time_of_day
-            }
+        result = {
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "analysis": analysis,
+            "recommendations": self._extract_recommendations(analysis),
+            "location": location_name,
+            "time_of_day": time_of_day
+        }
 
-        except Exception as e:
-            print(f"Gemini safety check error: {str(e)}")
-            # Return a safe default response if there's an error
-            return {
-                "risk_score": 50,
-                "risk_level": "medium",
-                "analysis": f"Error performing safety analysis: {str(e)}",
-                "recommendations": ["Unable to assess safety at this time"],
-                "location": location_name,
-                "time_of_day": time_of_day
-            }
+        self.safety_cache[cache_key] = result
+        return result
 
     def _estimate_risk_score(self, analysis: str) -> int:
         """
@@ -167,16 +601,12 @@ Consider factors like:
         Returns:
             Risk score from 0-100
         """
-        analysis_lower = analysis.lower()
+        # Find which keywords appear (one regex pass over the text)
+        found = {match.group(1).lower() for match in _RISK_KEYWORD_RE.finditer(analysis)}
 
-        # Keywords that indicate safety
-        safe_keywords = ['safe', 'low risk', 'secure', 'protected', 'tourist-friendly']
-        # Keywords that indicate danger
-        danger_keywords = ['danger', 'high risk', 'avoid', 'caution', 'unsafe', 'critical']
-
-        # Count how many times each type of keyword appears
-        safe_count = sum(1 for keyword in safe_keywords if keyword in analysis_lower)
-        danger_count = sum(1 for keyword in danger_keywords if keyword in analysis_lower)
+        # Count how many different keywords of each type appear
+        safe_count = len(found & SAFE_KEYWORDS)
+        danger_count = len(found & DANGER_KEYWORDS)
 
         # Calculate score (0-100)
         # More danger keywords = higher score (more dangerous)
@@ -188,10 +618,15 @@ Consider factors like:
         else:
             return 40  # Neutral
 
-    def _get_risk_level(self, score: int) -> str:
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _get_risk_level(score: int) -> str:
         """
         Convert numeric risk score to text level
 
+        Scores are whole numbers 0-100, so the answers are cached
+        (static so the cache doesn't keep a reference to the service).
+
         Makes it easier for humans to understand:
         - 0-29 = "low"
         - 30-59 = "medium"
@@ -222,7 +657,7 @@ Consider factors like:
             line = line.strip()
             # Look for lines that seem like recommendations
             # These usually contain words like "should", "recommend", etc.
-            if any(word in line.lower() for word in ['should', 'recommend', 'consider', 'avoid', 'ensure']):
+            if _RECOMMENDATION_RE.search(line):
                 # Clean up the line and add it
                 if line:
                     recommendations.append(line)
@@ -236,7 +671,3 @@ Consider factors like:
 
         # Return maximum 5 recommendations
         return recommendations[:5]
-
-# Create a single instance to be used throughout the app
-# This is called a "singleton" pattern - one object shared everywhere
-gemini_service = GeminiService()
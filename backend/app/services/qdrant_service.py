@@ -9,11 +9,177 @@ Example: Searching for "romantic spots" will find "sunset beach" even though
 the words are different, because they have similar meanings.
 """
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from typing import List, Dict, Optional
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Datatype,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    MatchAny,
+    MatchValue,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    PayloadSelectorInclude,
+    PointStruct,
+    QuantizationSearchParams,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+import asyncio
+import logging
+import random
+import numpy as np
 import google.generativeai as genai
 from app.config import settings
+from app.services.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# text-embedding-004 returns 768 numbers per text
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_SIZE = 768
+
+# Returned when embedding fails - one shared (immutable) vector instead of a new list each time
+ZERO_EMBEDDING: Tuple[float, ...] = (0.0,) * EMBEDDING_SIZE
+
+# Bulk ingestion: texts embedded per Gemini call (the API's per-request limit)
+EMBED_BATCH_SIZE = 100
+# ...and how many of those calls may run at the same time
+EMBED_CONCURRENCY = 4
+
+# HNSW graph settings for new collections: more links per node (m) and a
+# wider search while building (ef_construct) give a better graph, so
+# queries find the nearest neighbours with fewer steps
+HNSW_M = 24
+HNSW_EF_CONSTRUCT = 128
+
+# Big bulk loads (at least this many locations) switch Qdrant's indexing
+# off and build the HNSW index once at the end, instead of rebuilding it
+# again and again while points arrive
+BULK_LOAD_MIN_POINTS = 1_000
+# Qdrant's default indexing_threshold (KB of vectors per segment before it
+# gets indexed) - restored after a bulk load if the collection didn't set one
+DEFAULT_INDEXING_THRESHOLD = 20_000
+
+# Payload fields that searches filter on (see build_filter), and their index types
+PAYLOAD_INDEXES = {
+    "category": PayloadSchemaType.KEYWORD,
+    "priceRange": PayloadSchemaType.KEYWORD,  # "$" to "$$$$"
+    "halalCertified": PayloadSchemaType.BOOL,
+    "familyFriendly": PayloadSchemaType.BOOL,
+    "tags": PayloadSchemaType.KEYWORD,
+}
+
+# INT8 copy of every vector, kept in RAM for fast distance math
+# quantile=0.99 ignores the most extreme 1% of values when choosing the
+# INT8 range, so outliers don't squash everything else into a few levels
+QUANTIZATION_CONFIG = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+)
+
+# How many candidates a search explores by default (higher = more accurate, slower)
+DEFAULT_HNSW_EF = 64
+
+# Concurrent searches are sent to Qdrant together (one query_batch_points call)
+# A batch is sent when it has this many searches...
+SEARCH_BATCH_SIZE = 32
+# ...or when this many seconds passed since its first search arrived
+SEARCH_BATCH_WINDOW = 0.005
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and trim a search query, so trivially different queries share a cached embedding"""
+    return query.strip().lower()
+
+
+def _price_levels(filters: Optional[Dict]) -> Optional[List[str]]:
+    """
+    Price levels allowed by the min_price/max_price filters
+
+    Locations store their price as "$" to "$$$$". Shared by build_filter
+    and matches_filters so Qdrant and the fallback always agree.
+
+    Returns:
+        None if there is no price filter, otherwise the allowed levels
+        (an empty list when min_price > max_price - nothing can match)
+    """
+    if not filters:
+        return None
+
+    min_price = filters.get('min_price')
+    max_price = filters.get('max_price')
+    if min_price is None and max_price is None:
+        return None
+
+    return ["$" * level for level in range(min_price or 1, (max_price or 4) + 1)]
+
+
+def build_filter(filters: Optional[Dict]) -> Optional[Filter]:
+    """
+    Turn search filters into a Qdrant Filter
+
+    Qdrant applies the filter while walking the vector index, so only
+    matching locations are returned (instead of fetching results and
+    throwing most of them away afterwards).
+
+    Args:
+        filters: Dictionary from SearchFilters (only the filters that are set)
+
+    Returns:
+        Qdrant Filter, or None if there is nothing to filter on
+    """
+    if not filters:
+        return None
+
+    conditions = []
+
+    if filters.get('category'):
+        conditions.append(FieldCondition(key="category", match=MatchValue(value=filters['category'])))
+
+    price_levels = _price_levels(filters)
+    if price_levels is not None:
+        conditions.append(FieldCondition(key="priceRange", match=MatchAny(any=price_levels)))
+
+    if filters.get('is_halal') is not None:
+        conditions.append(FieldCondition(key="halalCertified", match=MatchValue(value=filters['is_halal'])))
+
+    if filters.get('is_family_friendly') is not None:
+        conditions.append(FieldCondition(key="familyFriendly", match=MatchValue(value=filters['is_family_friendly'])))
+
+    return Filter(must=conditions) if conditions else None
+
+
+def matches_filters(payload: Dict, filters: Optional[Dict]) -> bool:
+    """
+    Check one location against search filters in Python
+
+    Same rules as build_filter, for the in-memory fallback (no Qdrant).
+    """
+    if not filters:
+        return True
+
+    if filters.get('category') and payload.get('category') != filters['category']:
+        return False
+
+    price_levels = _price_levels(filters)
+    if price_levels is not None and payload.get('priceRange') not in price_levels:
+        return False
+
+    if filters.get('is_halal') is not None and payload.get('halalCertified') != filters['is_halal']:
+        return False
+
+    if filters.get('is_family_friendly') is not None and payload.get('familyFriendly') != filters['is_family_friendly']:
+        return False
+
+    return True
+
 
 class QdrantService:
     """
@@ -34,9 +200,14 @@ class QdrantService:
         # Check if Qdrant credentials are provided
         if settings.QDRANT_URL and settings.QDRANT_API_KEY:
             # Connect to Qdrant Cloud
-            self.client = QdrantClient(
+            # gRPC (binary, HTTP/2) is faster than REST/JSON, especially for vectors
+            # (QDRANT_PREFER_GRPC=False falls back to REST if the gRPC port is closed)
+            # The async client waits for Qdrant without blocking other requests
+            self.client = AsyncQdrantClient(
                 url=settings.QDRANT_URL,
-                api_key=settings.QDRANT_API_KEY
+                api_key=settings.QDRANT_API_KEY,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                grpc_port=settings.QDRANT_GRPC_PORT
             )
             self.use_qdrant = True
         else:
@@ -47,43 +218,166 @@ class QdrantService:
         # Configure Gemini for creating embeddings
         genai.configure(api_key=settings.GEMINI_API_KEY)
 
+        # Repeated texts are embedded once, then served from this cache
+        self.embedding_cache = EmbeddingCache(
+            model=EMBEDDING_MODEL,
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            path=settings.EMBEDDING_CACHE_PATH
+        )
+
         # Collection name in Qdrant (like a "table" in traditional databases)
         self.collection_name = "dubai_locations"
 
-    async def create_embedding(self, text: str) -> List[float]:
+        # Payload fields search results actually use
+        # Qdrant only sends these back, not the whole stored location
+        self.result_fields = ["name", "description", "category", "tags"]
+
+        # Searches waiting to be sent to Qdrant in the next batch
+        # Each item is (QueryRequest, future that receives the hits)
+        self._search_queue: Optional[asyncio.Queue] = None
+        self._search_batcher: Optional[asyncio.Task] = None
+        self._search_batch_tasks: set = set()  # Keeps running batches referenced
+
+        # In-memory index (used when Qdrant isn't configured):
+        # one row of _local_vectors per location, normalized to length 1
+        # so a single matrix multiply gives every cosine similarity at once.
+        # The matrix has spare rows (it grows by doubling); only the first
+        # len(_local_ids) rows are in use
+        self._local_rows: Dict = {}  # location ID -> row number
+        self._local_ids: List = []
+        self._local_payloads: List[Dict] = []
+        self._local_vectors = np.empty((0, EMBEDDING_SIZE), dtype=np.float32)
+
+    async def aclose(self) -> None:
+        """Stop the search batcher and close connections (called on app shutdown)"""
+        if self._search_batcher is not None:
+            self._search_batcher.cancel()
+            try:
+                await self._search_batcher
+            except asyncio.CancelledError:
+                pass
+            self._search_batcher = None
+
+        self.embedding_cache.close()
+
+        if self.client is not None:
+            await self.client.close()
+
+    async def ensure_collection(self) -> None:
+        """
+        Create the locations collection if needed and index filter fields
+        (run once at startup)
+
+        The collection stores an INT8 (scalar quantized) copy of every vector
+        in RAM: 4x less memory and faster distance math. Searches rescore the
+        best candidates with the full vectors, so results stay accurate.
+        New collections also get a denser HNSW graph (HNSW_M / HNSW_EF_CONSTRUCT),
+        and keep their full vectors (stored as FLOAT16 - half the size of FLOAT32)
+        and payloads on disk: only the small INT8 vectors (and payload indexes)
+        need RAM, and full data is read just for the top hits being rescored/returned.
+        """
+        if not self.use_qdrant:
+            return
+
+        try:
+            if not await self.client.collection_exists(self.collection_name):
+                await self.client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config=VectorParams(
+                        size=EMBEDDING_SIZE,
+                        distance=Distance.COSINE,
+                        on_disk=True,
+                        datatype=Datatype.FLOAT16
+                    ),
+                    on_disk_payload=True,
+                    hnsw_config=HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT),
+                    quantization_config=QUANTIZATION_CONFIG
+                )
+            else:
+                # Collections created before quantization was enabled get it now
+                # (Qdrant builds the INT8 copies in the background)
+                info = await self.client.get_collection(self.collection_name)
+                if info.config.quantization_config is None:
+                    await self.client.update_collection(
+                        collection_name=self.collection_name,
+                        quantization_config=QUANTIZATION_CONFIG
+                    )
+
+            # Without an index Qdrant has to check each candidate's payload;
+            # with one, filtered searches stay fast as the collection grows
+            # (creating an index that already exists is a no-op)
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
+        except Exception:
+            logger.exception("Collection setup error")
+
+    async def create_embedding(self, text: str, task_type: str = "retrieval_query") -> Tuple[float, ...]:
         """
         Convert text to a vector (list of numbers)
 
+        Gemini makes slightly different vectors for search queries and for the
+        documents being searched, tuned to match each other. Use
+        "retrieval_query" for what users type and "retrieval_document" for
+        locations being stored.
+
         How it works:
-        1. Send text to Gemini
-        2. Gemini analyzes the meaning
-        3. Returns a list of 768 numbers representing the meaning
+        1. Send text to Gemini, unless it's already in the embedding cache
+        2. Returns 768 numbers representing the meaning
+
+        The text is embedded exactly as given - callers normalize it if they
+        want to (search() lowercases queries so "Beach " and "beach" share
+        a cache entry; stored locations are embedded as-is).
 
         Args:
             text: The text to convert (e.g., "romantic sunset spots")
+            task_type: "retrieval_query" (default) or "retrieval_document"
 
         Returns:
-            List of 768 numbers (the vector/embedding)
+            Tuple of 768 numbers (the vector/embedding), all zeros on error.
+            Tuples can't be changed, so the cached vector is returned as-is
+            instead of being copied for every caller.
         """
         try:
-            # Use Gemini's embedding model
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_query"
-            )
-            return result['embedding']
+            # Cache lookup and Gemini call are blocking, so run them in a thread
+            return await asyncio.to_thread(self._embed, text, task_type)
 
-        except Exception as e:
-            print(f"Embedding error: {str(e)}")
+        except Exception:
+            logger.exception("Embedding error")
             # Return a zero vector if there's an error
-            return [0.0] * 768
+            return ZERO_EMBEDDING
+
+    def _embed(self, text: str, task_type: str) -> Tuple[float, ...]:
+        """
+        Embed text with Gemini, using the cache when possible
+
+        Errors are raised (never cached) so a failed call can be retried.
+        """
+        # Query and document vectors differ, so they're cached separately
+        key = self.embedding_cache.key(f"{task_type}:{text}")
+        embedding = self.embedding_cache.get(key)
+        if embedding is not None:
+            return embedding
+
+        result = genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=text,
+            task_type=task_type
+        )
+        embedding = tuple(result['embedding'])
+        self.embedding_cache.put(key, embedding)
+        return embedding
 
     async def search(
         self,
         query: str,
         limit: int = 10,
-        filters: Optional[Dict] = None
+        filters: Optional[Dict] = None,
+        hnsw_ef: int = DEFAULT_HNSW_EF,
+        exact: bool = False
     ) -> List[Dict]:
         """
         Search for locations using semantic search
@@ -92,6 +386,9 @@ class QdrantService:
             query: What the user is looking for (e.g., "family-friendly activities")
             limit: Maximum number of results to return
             filters: Optional filters (category, price, etc.)
+            hnsw_ef: Candidates to explore - lower for fast, rough searches
+                     (e.g. 40 for autocomplete), higher (100-200) for best recall
+            exact: Compare against every vector instead of using the index
 
         Returns:
             List of matching locations with similarity scores
@@ -101,21 +398,35 @@ class QdrantService:
         2. Find locations with similar vectors
         3. Return the most similar ones
         """
+        # e.g. min_price=4, max_price=2: nothing can match, so don't search at all
+        # (Qdrant would reject the empty price list)
+        if _price_levels(filters) == []:
+            return []
+
         if not self.use_qdrant:
             # Fallback to simple in-memory search
             return await self._in_memory_search(query, limit, filters)
 
         try:
             # Step 1: Convert query to vector
-            query_vector = await self.create_embedding(query)
+            query_vector = await self.create_embedding(normalize_query(query))
 
             # Step 2: Search in Qdrant
             # This finds vectors (locations) that are mathematically similar
-            search_result = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=limit
-            )
+            search_result = await self._batched_search(QueryRequest(
+                query=query_vector,
+                filter=build_filter(filters),
+                # Search the quantized vectors, then rescore 2x the needed
+                # candidates with full precision vectors
+                params=SearchParams(
+                    hnsw_ef=hnsw_ef,
+                    exact=exact,
+                    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+                ),
+                limit=limit,
+                with_payload=PayloadSelectorInclude(include=self.result_fields),
+                with_vector=False
+            ))
 
             # Step 3: Format and return results
             results = []
@@ -128,11 +439,69 @@ class QdrantService:
 
             return results
 
-        except Exception as e:
-            print(f"Qdrant search error: {str(e)}")
+        except Exception:
+            logger.exception("Qdrant search error")
             # Fallback to in-memory search if Qdrant fails
             return await self._in_memory_search(query, limit, filters)
 
+    async def _batched_search(self, request: QueryRequest) -> List:
+        """
+        Queue a search and wait for its hits
+
+        Searches arriving at about the same time are sent to Qdrant in a
+        single query_batch_points call: one round trip for many queries.
+        """
+        if self._search_batcher is None or self._search_batcher.done():
+            self._search_queue = asyncio.Queue()
+            self._search_batcher = asyncio.create_task(self._run_search_batches())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._search_queue.put((request, future))
+        return await future
+
+    async def _run_search_batches(self) -> None:
+        """
+        Background loop: collect queued searches into batches
+
+        A batch is sent when it has SEARCH_BATCH_SIZE searches or
+        SEARCH_BATCH_WINDOW seconds after its first search arrived.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._search_queue.get()]
+            deadline = loop.time() + SEARCH_BATCH_WINDOW
+
+            while len(batch) < SEARCH_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._search_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Send it in the background so the next batch can start collecting
+            task = asyncio.create_task(self._send_search_batch(batch))
+            self._search_batch_tasks.add(task)
+            task.add_done_callback(self._search_batch_tasks.discard)
+
+    async def _send_search_batch(self, batch: List) -> None:
+        """Run one query_batch_points call and hand each caller its own hits"""
+        try:
+            responses = await self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[request for request, _ in batch]
+            )
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response.points)
+
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
     async def _in_memory_search(
         self,
         query: str,
@@ -140,32 +509,82 @@ class QdrantService:
         filters: Optional[Dict] = None
     ) -> List[Dict]:
         """
-        Simple in-memory search (fallback when Qdrant is not available)
+        In-memory semantic search (fallback when Qdrant is not available)
 
-        This is a basic text-matching search, not semantic.
-        It looks for exact keyword matches rather than meaning.
+        Searches the locations added while Qdrant wasn't configured.
+        All similarities are computed with one NumPy matrix multiply,
+        then only the top `limit` scores are sorted.
         """
-        # This would normally load from a database or file
-        # For now, return empty results
-        # You can add sample data here for testing
-        sample_locations = []
-
-        # Simple keyword matching
-        query_lower = query.lower()
-        results = []
-
-        for location in sample_locations:
-            # Check if any query words appear in the location
-            location_text = f"{location.get('name', '')} {location.get('description', '')}".lower()
-
-            if any(word in location_text for word in query_lower.split()):
-                results.append({
-                    "id": location.get('id'),
-                    "score": 0.8,  # Fake score for fallback
-                    "payload": location
-                })
+        if not self._local_ids:
+            return []
+
+        query_vector = np.asarray(await self.create_embedding(normalize_query(query)), dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            # Embedding failed - nothing to compare against
+            return []
+
+        # Cosine similarity with every location (rows are already normalized)
+        scores = self._local_vectors[:len(self._local_ids)] @ (query_vector / norm)
+
+        if filters:
+            allowed = np.fromiter(
+                (matches_filters(payload, filters) for payload in self._local_payloads),
+                dtype=bool,
+                count=len(self._local_payloads)
+            )
+            scores = np.where(allowed, scores, -np.inf)
+
+        # Pick the best `limit` rows without sorting everything, then sort just those
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {
+                "id": self._local_ids[row],
+                "score": float(scores[row]),
+                "payload": self._local_payloads[row]
+            }
+            for row in top
+            if scores[row] != -np.inf
+        ]
+
+    def _add_local(self, points: List[PointStruct]) -> None:
+        """Add points to the in-memory index (replacing any with the same ID)"""
+        vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        for point, vector in zip(points, vectors):
+            row = self._local_rows.get(point.id)
+            if row is None:
+                # New location: use the next free row, growing the matrix by
+                # doubling so adding N locations one at a time stays O(N)
+                row = len(self._local_ids)
+                if row == len(self._local_vectors):
+                    capacity = max(2 * row, 64)
+                    self._local_vectors = np.resize(self._local_vectors, (capacity, EMBEDDING_SIZE))
+                self._local_rows[point.id] = row
+                self._local_ids.append(point.id)
+                self._local_payloads.append(point.payload)
+            else:
+                self._local_payloads[row] = point.payload
+
+            self._local_vectors[row] = vector
+
+    @staticmethod
+    def _build_searchable_text(location_data: Dict) -> str:
+        """
+        Text that gets embedded for a location: name, description and tags
 
-        return results[:limit]
+        Example: "Dubai Mall Huge shopping centre shopping family indoor"
+        """
+        return " ".join((
+            location_data.get('name', ''),
+            location_data.get('description', ''),
+            *location_data.get('tags', ())
+        ))
 
     async def add_location(self, location_id: str, location_data: Dict) -> bool:
         """
@@ -181,17 +600,14 @@ class QdrantService:
         How it works:
         1. Create text description of location
         2. Convert to vector
-        3. Store in Qdrant with metadata
+        3. Store in Qdrant with metadata (or the in-memory index without Qdrant)
         """
-        if not self.use_qdrant:
-            return False
-
         try:
             # Combine location data into searchable text
-            searchable_text = f"{location_data.get('name', '')} {location_data.get('description', '')} {' '.join(location_data.get('tags', []))}"
+            searchable_text = self._build_searchable_text(location_data)
 
-            # Create vector from text
-            vector = await self.create_embedding(searchable_text)
+            # Create vector from text (as a document - queries are matched against it)
+            vector = await self.create_embedding(searchable_text, task_type="retrieval_document")
 
             # Create a point (entry) in Qdrant
             point = PointStruct(
@@ -200,17 +616,132 @@ class QdrantService:
                 payload=location_data  # Store all the location details
             )
 
+            if not self.use_qdrant:
+                self._add_local([point])
+                return True
+
             # Upload to Qdrant
-            self.client.upsert(
+            await self.client.upsert(
                 collection_name=self.collection_name,
                 points=[point]
             )
 
             return True
 
-        except Exception as e:
-            print(f"Error adding location: {str(e)}")
+        except Exception:
+            logger.exception("Error adding location")
             return False
 
-# Create singleton instance
-qdrant_service = QdrantService()
+    async def add_locations(self, locations: Dict[str, Dict]) -> int:
+        """
+        Add many locations at once (bulk ingestion)
+
+        Much faster than calling add_location in a loop: Gemini embeds
+        EMBED_BATCH_SIZE texts per request, and each batch is written to
+        Qdrant in a single upsert. Up to EMBED_CONCURRENCY batches are in
+        flight at once, so we aren't idle while waiting on the network.
+
+        Args:
+            locations: Location ID -> location details
+
+        Returns:
+            Number of locations added
+        """
+        if not locations:
+            return 0
+
+        items = list(locations.items())
+        batches = [items[start:start + EMBED_BATCH_SIZE] for start in range(0, len(items), EMBED_BATCH_SIZE)]
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+        async def add_batch(batch: List[Tuple[str, Dict]]) -> int:
+            texts = [self._build_searchable_text(data) for _, data in batch]
+
+            async with semaphore:
+                # Small random delay so the batches don't all hit Gemini at the same instant
+                await asyncio.sleep(random.uniform(0, 0.05))
+
+                # One Gemini call embeds the whole batch (blocking, so run it in a thread)
+                result = await asyncio.to_thread(
+                    genai.embed_content,
+                    model=EMBEDDING_MODEL,
+                    content=texts,
+                    task_type="retrieval_document"
+                )
+
+            points = [
+                PointStruct(id=location_id, vector=vector, payload=data)
+                for (location_id, data), vector in zip(batch, result['embedding'])
+            ]
+
+            if not self.use_qdrant:
+                self._add_local(points)
+                return len(points)
+
+            # wait=False: Qdrant acknowledges once the points are received,
+            # without waiting for them to be indexed
+            await self.client.upsert(
+                collection_name=self.collection_name,
+                points=points,
+                wait=False
+            )
+            return len(points)
+
+        # Big loads: pause indexing until every point is in
+        # (the collection's own setting is put back afterwards)
+        previous_threshold = None
+        if self.use_qdrant and len(items) >= BULK_LOAD_MIN_POINTS:
+            previous_threshold = await self._get_indexing_threshold()
+            if previous_threshold is not None:
+                await self._set_indexing_threshold(0)
+
+        try:
+            # A failed batch doesn't stop the others
+            results = await asyncio.gather(*(add_batch(batch) for batch in batches), return_exceptions=True)
+        finally:
+            if previous_threshold is not None:
+                await self._set_indexing_threshold(previous_threshold)
+
+        added = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Error adding locations", exc_info=result)
+            else:
+                added += result
+        return added
+
+    async def _get_indexing_threshold(self) -> Optional[int]:
+        """
+        The collection's current indexing threshold
+
+        Returns None if it can't be read - the bulk load then leaves
+        indexing alone rather than risk not being able to restore it.
+        """
+        try:
+            info = await self.client.get_collection(self.collection_name)
+            threshold = info.config.optimizer_config.indexing_threshold
+            return DEFAULT_INDEXING_THRESHOLD if threshold is None else threshold
+        except Exception:
+            logger.exception("Error reading indexing threshold")
+            return None
+
+    async def _set_indexing_threshold(self, threshold: int) -> None:
+        """Change when Qdrant builds the HNSW index (0 = don't index for now)"""
+        try:
+            await self.client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+            )
+        except Exception:
+            logger.exception("Error updating indexing threshold")
+
+@lru_cache(maxsize=1)
+def get_qdrant_service() -> QdrantService:
+    """
+    The shared QdrantService, created on first use
+
+    Not created at import time, so importing this module (tests, scripts,
+    `--help`) doesn't set up Qdrant/Gemini clients. Every call after the
+    first returns the same instance.
+    """
+    return QdrantService()